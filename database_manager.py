@@ -5,134 +5,258 @@ Handles SQLite database operations with safety checks and beautiful output
 """
 import sqlite3
 import os
+import io
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import pathname2url
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from itertools import chain
+from typing import Optional, List, Dict, Any, Tuple, FrozenSet, Sequence
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
 from rich.text import Text
 import re
 
+# Statements that need confirmation, matched in a single case-insensitive pass
+_DANGEROUS_RE = re.compile(r'\b(DROP\s+TABLE|DROP\s+DATABASE|DELETE\s+FROM|TRUNCATE|ALTER\s+TABLE)\b', re.I)
+_WHERE_RE = re.compile(r'\bWHERE\b', re.I)
+_DANGEROUS_WARNINGS = {
+    'DROP TABLE': 'This will permanently delete a table and all its data',
+    'DROP DATABASE': 'This will permanently delete the entire database',
+    'DELETE FROM': 'This will delete records (potentially all records if no WHERE clause)',
+    'TRUNCATE': 'This will delete all records from a table',
+    'ALTER TABLE': 'This will modify table structure'
+}
+
+# Default SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_MAX_VARIABLES = 999
+
+# Read-only connections used to fan out independent reads
+_READ_POOL_SIZE = 4
+_MMAP_SIZE = 256 * 1024 * 1024  # Read pages through a memory map instead of read() calls
+
+# Statements whose EXPLAIN opcodes are remembered per manager
+_OPCODE_CACHE_SIZE = 256
+
+# First keyword of a statement, after any leading comments
+_FIRST_KEYWORD_RE = re.compile(r'\s*(--[^\n]*\n|/\*.*?\*/|\s)*([A-Za-z]+)', re.S)
+
+def _classify_via_regex(sql: str) -> Tuple[bool, str]:
+    """Check SQL for dangerous keywords"""
+    for match in _DANGEROUS_RE.finditer(sql):
+        operation = " ".join(match.group(1).upper().split())
+        # Check if DELETE has WHERE clause
+        if operation == 'DELETE FROM' and _WHERE_RE.search(sql):
+            continue  # DELETE with WHERE is safer
+        return True, _DANGEROUS_WARNINGS[operation]
+    
+    return False, ""
+
+def _quote_identifier(name: str) -> str:
+    """Quote a table or column name for use in SQL"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _insert_rows(cursor: sqlite3.Cursor, table: str, columns: Sequence[str], rows: Sequence[Tuple]):
+    """Insert rows with multi-row VALUES statements, chunked to stay under SQLite's parameter limit"""
+    placeholders = "(" + ", ".join("?" * len(columns)) + ")"
+    rows_per_statement = _MAX_VARIABLES // len(columns)
+    for start in range(0, len(rows), rows_per_statement):
+        chunk = rows[start:start + rows_per_statement]
+        cursor.execute(
+            f"INSERT INTO {_quote_identifier(table)} ({', '.join(map(_quote_identifier, columns))}) VALUES "
+            + ", ".join([placeholders] * len(chunk)),
+            list(chain.from_iterable(chunk))
+        )
+
+class QueryResult(dict):
+    """Result of a SELECT; rows are kept as sqlite3.Row tuples"""
+    
+    def rows_as_dicts(self) -> List[Dict[str, Any]]:
+        """Return the rows as plain dicts, e.g. for JSON serialization"""
+        return [dict(row) for row in self["data"]]
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "data/database.db"):
+    def __init__(self, db_path: str = "data/database.db", quiet: bool = False):
         self.db_path = db_path
-        self.console = Console()
+        self.quiet = quiet
+        # Quiet mode records output instead of writing it; callers dump it once with export_text()
+        self.console = Console(file=io.StringIO(), record=True) if quiet else Console()
+        self._schema_cache: Optional[Dict[str, str]] = None
+        self._read_pool: Optional["queue.Queue[sqlite3.Connection]"] = None
+        
+        # The same generated SQL is often classified more than once. A plain dict keeps the
+        # manager free of reference cycles, so __del__ closes the connections as soon as it is dropped
+        self._opcode_cache: Dict[str, FrozenSet[str]] = {}
         
         # Ensure data directory exists
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        
+        # Open one persistent connection and tune it for concurrent reads
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row  # This allows column name access
+        if not db_path.endswith(':memory:'):
+            self.conn.executescript("""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous=NORMAL;
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-64000;
+                PRAGMA busy_timeout=5000;
+            """)
+            self.conn.execute(f"PRAGMA mmap_size={_MMAP_SIZE}")
         
         # Initialize database
         self.init_database()
     
+    def close(self):
+        """Close the database connections"""
+        self.conn.close()
+        if self._read_pool is not None:
+            while not self._read_pool.empty():
+                self._read_pool.get_nowait().close()
+    
+    def __del__(self):
+        if getattr(self, "conn", None) is not None:
+            self.close()
+    
     def init_database(self):
         """Initialize database with sample tables and data"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Create users table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        email TEXT UNIQUE NOT NULL,
-                        age INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Create products table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS products (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT NOT NULL,
-                        price REAL NOT NULL,
-                        category TEXT,
-                        stock INTEGER DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # Create orders table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS orders (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        product_id INTEGER,
-                        quantity INTEGER NOT NULL,
-                        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        status TEXT DEFAULT 'pending',
-                        FOREIGN KEY (user_id) REFERENCES users (id),
-                        FOREIGN KEY (product_id) REFERENCES products (id)
-                    )
-                ''')
-                
-                # Insert sample data (only if tables are empty)
-                cursor.execute("SELECT COUNT(*) FROM users")
-                if cursor.fetchone()[0] == 0:
-                    sample_users = [
-                        ('Alice Johnson', 'alice@example.com', 28),
-                        ('Bob Smith', 'bob@example.com', 35),
-                        ('Carol Brown', 'carol@example.com', 22),
-                        ('David Wilson', 'david@example.com', 41),
-                        ('Eva Davis', 'eva@example.com', 29)
-                    ]
-                    cursor.executemany("INSERT INTO users (name, email, age) VALUES (?, ?, ?)", sample_users)
-                
-                cursor.execute("SELECT COUNT(*) FROM products")
-                if cursor.fetchone()[0] == 0:
-                    sample_products = [
-                        ('Laptop', 999.99, 'Electronics', 50),
-                        ('Coffee Mug', 12.99, 'Kitchen', 200),
-                        ('Book: Python Guide', 29.99, 'Books', 75),
-                        ('Wireless Mouse', 25.50, 'Electronics', 120),
-                        ('Plant Pot', 8.99, 'Garden', 30)
-                    ]
-                    cursor.executemany("INSERT INTO products (name, price, category, stock) VALUES (?, ?, ?, ?)", sample_products)
-                
-                cursor.execute("SELECT COUNT(*) FROM orders")
-                if cursor.fetchone()[0] == 0:
-                    sample_orders = [
-                        (1, 1, 1, 'completed'),
-                        (2, 2, 2, 'pending'),
-                        (1, 3, 1, 'completed'),
-                        (3, 1, 1, 'shipped'),
-                        (4, 4, 3, 'pending')
-                    ]
-                    cursor.executemany("INSERT INTO orders (user_id, product_id, quantity, status) VALUES (?, ?, ?, ?)", sample_orders)
-                
-                conn.commit()
+            cursor = self.conn.cursor()
+            
+            # user_version marks a database that has already been created and seeded
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] < 1:
+                self._seed_database(cursor)
+            
+            if not self.quiet:
                 self.console.print("✅ Database initialized with sample data", style="green")
-                
+            
         except Exception as e:
+            if self.conn.in_transaction:
+                self.conn.rollback()
             self.console.print(f"❌ Database initialization error: {e}", style="red")
     
-    def is_dangerous_query(self, sql: str) -> Tuple[bool, str]:
-        """Check if SQL query is potentially dangerous"""
-        sql_upper = sql.upper().strip()
+    def _seed_database(self, cursor: sqlite3.Cursor):
+        """Create the sample tables and fill any that are empty"""
+        # Create and seed everything in one write transaction (a single commit)
+        cursor.execute("BEGIN IMMEDIATE")
+        
+        # Create users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                email TEXT UNIQUE NOT NULL,
+                age INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Create products table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS products (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                price REAL NOT NULL,
+                category TEXT,
+                stock INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
         
-        dangerous_operations = [
-            ('DROP TABLE', 'This will permanently delete a table and all its data'),
-            ('DROP DATABASE', 'This will permanently delete the entire database'),
-            ('DELETE FROM', 'This will delete records (potentially all records if no WHERE clause)'),
-            ('TRUNCATE', 'This will delete all records from a table'),
-            ('ALTER TABLE', 'This will modify table structure')
-        ]
+        # Create orders table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER,
+                product_id INTEGER,
+                quantity INTEGER NOT NULL,
+                order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                status TEXT DEFAULT 'pending',
+                FOREIGN KEY (user_id) REFERENCES users (id),
+                FOREIGN KEY (product_id) REFERENCES products (id)
+            )
+        ''')
         
-        for operation, warning in dangerous_operations:
-            if operation in sql_upper:
-                # Check if DELETE has WHERE clause
-                if operation == 'DELETE FROM' and 'WHERE' in sql_upper:
-                    continue  # DELETE with WHERE is safer
-                return True, warning
+        # Insert sample data (only if tables are empty)
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM users)")
+        if not cursor.fetchone()[0]:
+            sample_users = [
+                ('Alice Johnson', 'alice@example.com', 28),
+                ('Bob Smith', 'bob@example.com', 35),
+                ('Carol Brown', 'carol@example.com', 22),
+                ('David Wilson', 'david@example.com', 41),
+                ('Eva Davis', 'eva@example.com', 29)
+            ]
+            _insert_rows(cursor, "users", ("name", "email", "age"), sample_users)
         
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM products)")
+        if not cursor.fetchone()[0]:
+            sample_products = [
+                ('Laptop', 999.99, 'Electronics', 50),
+                ('Coffee Mug', 12.99, 'Kitchen', 200),
+                ('Book: Python Guide', 29.99, 'Books', 75),
+                ('Wireless Mouse', 25.50, 'Electronics', 120),
+                ('Plant Pot', 8.99, 'Garden', 30)
+            ]
+            _insert_rows(cursor, "products", ("name", "price", "category", "stock"), sample_products)
+        
+        cursor.execute("SELECT EXISTS(SELECT 1 FROM orders)")
+        if not cursor.fetchone()[0]:
+            sample_orders = [
+                (1, 1, 1, 'completed'),
+                (2, 2, 2, 'pending'),
+                (1, 3, 1, 'completed'),
+                (3, 1, 1, 'shipped'),
+                (4, 4, 3, 'pending')
+            ]
+            _insert_rows(cursor, "orders", ("user_id", "product_id", "quantity", "status"), sample_orders)
+        
+        cursor.execute("PRAGMA user_version = 1")
+        cursor.execute("COMMIT")
+    
+    def is_dangerous_query(self, sql: str) -> Tuple[bool, str]:
+        """Check if SQL query is potentially dangerous"""
+        try:
+            return self._classify_via_explain(sql)
+        except (sqlite3.Error, sqlite3.Warning):
+            # SQLite can't compile it on its own (e.g. TRUNCATE, several statements, bound parameters)
+            return _classify_via_regex(sql)
+    
+    def _explain_opcodes(self, sql: str) -> FrozenSet[str]:
+        """Compile the statement with EXPLAIN (without running it) and collect its VDBE opcodes"""
+        opcodes = self._opcode_cache.get(sql)
+        if opcodes is None:
+            opcodes = frozenset(row[1] for row in self.conn.execute("EXPLAIN " + sql))
+            if len(self._opcode_cache) >= _OPCODE_CACHE_SIZE:
+                del self._opcode_cache[next(iter(self._opcode_cache))]  # Drop the oldest entry
+            self._opcode_cache[sql] = opcodes
+        return opcodes
+    
+    def _classify_via_explain(self, sql: str) -> Tuple[bool, str]:
+        """Classify a statement from the VDBE program SQLite compiles for it"""
+        opcodes = self._explain_opcodes(sql)
+        if "DropTable" in opcodes:
+            return True, _DANGEROUS_WARNINGS['DROP TABLE']
+        if "Clear" in opcodes:
+            # SQLite's truncate optimization: DELETE with no WHERE clause
+            return True, _DANGEROUS_WARNINGS['DELETE FROM']
+        if "OpenWrite" in opcodes:
+            # Other writes (ALTER TABLE, DELETE on tables with triggers, ...) fall back to keywords
+            return _classify_via_regex(sql)
+        # Read-only statement, keywords in comments or strings don't count
         return False, ""
     
-    def execute_query(self, sql: str, params: Optional[List] = None) -> Dict[str, Any]:
-        """Execute SQL query and return results"""
+    def execute_query(self, sql: str, params: Optional[List] = None, confirmed: bool = False) -> Dict[str, Any]:
+        """
+        Execute SQL query and return results
+        confirmed=True skips the safety check, for callers that already ran is_dangerous_query themselves
+        """
         try:
             # Check for dangerous operations
-            is_dangerous, warning = self.is_dangerous_query(sql)
+            is_dangerous, warning = (False, "") if confirmed else self.is_dangerous_query(sql)
             if is_dangerous:
                 self.console.print(Panel(
                     f"⚠️  Dangerous Operation Detected!\n\n{warning}\n\nQuery: {sql}", 
@@ -140,6 +264,14 @@ class DatabaseManager:
                     style="red"
                 ))
                 
+                # A quiet manager has no visible prompt to answer; callers confirm with confirmed=True
+                if self.quiet:
+                    return {
+                        "success": False,
+                        "error": "Operation cancelled: confirmation is not possible in quiet mode",
+                        "cancelled": True
+                    }
+                
                 response = self.console.input("\nDo you want to proceed? (yes/no): ").lower()
                 if response not in ['yes', 'y']:
                     return {
@@ -148,50 +280,60 @@ class DatabaseManager:
                         "cancelled": True
                     }
             
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row  # This allows column name access
-                cursor = conn.cursor()
+            # Determine query type from the first keyword, skipping leading comments
+            match = _FIRST_KEYWORD_RE.match(sql)
+            sql_type = match.group(2).upper() if match else ""
+            cursor = self.conn.cursor()
+            
+            if sql_type in ['SELECT']:
+                cursor.execute(sql, params or ())
+                cursor.arraysize = 1000
+                columns = [description[0] for description in cursor.description] if cursor.description else []
                 
-                if params:
-                    cursor.execute(sql, params)
-                else:
-                    cursor.execute(sql)
+                # Read every row here, in batches of 1000, so errors on later rows belong to this query
+                data = []
+                for batch in iter(cursor.fetchmany, []):
+                    data.extend(batch)
                 
-                # Determine query type
-                sql_type = sql.strip().upper().split()[0]
+                return QueryResult({
+                    "success": True,
+                    "data": data,
+                    "columns": columns,
+                    "row_count": len(data),
+                    "query_type": "SELECT"
+                })
+            
+            elif sql_type in ['INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER']:
+                # The connection runs in autocommit mode, so writes get an explicit transaction
+                cursor.execute("BEGIN")
+                try:
+                    cursor.execute(sql, params or ())
+                except sqlite3.Error:
+                    cursor.execute("ROLLBACK")
+                    raise
+                affected_rows = cursor.rowcount
+                last_row_id = cursor.lastrowid
+                cursor.execute("COMMIT")
                 
-                if sql_type in ['SELECT']:
-                    results = cursor.fetchall()
-                    columns = [description[0] for description in cursor.description] if cursor.description else []
-                    
-                    return {
-                        "success": True,
-                        "data": [dict(row) for row in results],
-                        "columns": columns,
-                        "row_count": len(results),
-                        "query_type": "SELECT"
-                    }
+                # Only DDL changes the table definitions; any write can change compiled plans
+                if sql_type in ['CREATE', 'DROP', 'ALTER']:
+                    self._schema_cache = None
+                self._opcode_cache.clear()
                 
-                elif sql_type in ['INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER']:
-                    affected_rows = cursor.rowcount
-                    last_row_id = cursor.lastrowid
-                    
-                    conn.commit()
-                    
-                    return {
-                        "success": True,
-                        "affected_rows": affected_rows,
-                        "last_row_id": last_row_id,
-                        "query_type": sql_type,
-                        "message": f"{sql_type} operation completed successfully"
-                    }
+                return {
+                    "success": True,
+                    "affected_rows": affected_rows,
+                    "last_row_id": last_row_id,
+                    "query_type": sql_type,
+                    "message": f"{sql_type} operation completed successfully"
+                }
+            
+            else:
+                return {
+                    "success": False,
+                    "error": f"Unsupported query type: {sql_type}"
+                }
                 
-                else:
-                    return {
-                        "success": False,
-                        "error": f"Unsupported query type: {sql_type}"
-                    }
-                    
         except sqlite3.Error as e:
             return {
                 "success": False,
@@ -230,9 +372,9 @@ class DatabaseManager:
             for column in result["columns"]:
                 table.add_column(column, style="cyan")
             
-            # Add rows
+            # Add rows by position
             for row in result["data"]:
-                table.add_row(*[str(row[col]) for col in result["columns"]])
+                table.add_row(*map(str, row))
             
             self.console.print(table)
         
@@ -251,45 +393,127 @@ class DatabaseManager:
             
             self.console.print(Panel(message, title="✅ Success", style="green"))
     
-    def get_schema_info(self) -> str:
-        """Get database schema information for the LLM"""
+    def _get_read_pool(self) -> Optional["queue.Queue[sqlite3.Connection]"]:
+        """Lazily open read-only connections for parallel reads (file databases only)"""
+        if self._read_pool is None and not self.db_path.endswith(':memory:'):
+            uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+            self._read_pool = queue.Queue()
+            for _ in range(_READ_POOL_SIZE):
+                conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                conn.execute(f"PRAGMA mmap_size={_MMAP_SIZE}")
+                self._read_pool.put(conn)
+        return self._read_pool
+    
+    def _count_rows(self, tables: List[str]) -> List[int]:
+        """Exact row counts for the given tables, in the same order"""
+        if not tables:
+            return []
+        
+        pool = self._get_read_pool()
+        if pool is None or len(tables) == 1:
+            # Every count in a single statement on the main connection
+            cursor = self.conn.execute("SELECT " + ", ".join(
+                f"(SELECT COUNT(*) FROM {_quote_identifier(table)})" for table in tables
+            ))
+            return list(cursor.fetchone())
+        
+        def count(table: str) -> int:
+            conn = pool.get()
+            try:
+                return conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table)}").fetchone()[0]
+            finally:
+                pool.put(conn)
+        
+        # WAL readers don't block each other, and sqlite3 releases the GIL while scanning
+        with ThreadPoolExecutor(max_workers=_READ_POOL_SIZE) as executor:
+            return list(executor.map(count, tables))
+
+    def row_counts(self, tables: Sequence[str], exact: bool = False) -> Dict[str, int]:
+        """
+        Row counts by table name. Unless exact is set these are estimates:
+        ANALYZE statistics when present, otherwise the largest rowid (one B-tree seek per table)
+        """
+        if exact:
+            return dict(zip(tables, self._count_rows(list(tables))))
+
+        counts: Dict[str, int] = {}
+        try:
+            placeholders = ", ".join("?" * len(tables))
+            for table, stat in self.conn.execute(
+                f"SELECT tbl, stat FROM sqlite_stat1 WHERE tbl IN ({placeholders})", tuple(tables)
+            ):
+                counts.setdefault(table, int(stat.split()[0]))
+        except sqlite3.OperationalError:
+            pass  # No sqlite_stat1 until ANALYZE has run
+
+        remaining = [table for table in tables if table not in counts]
+        if remaining:
+            try:
+                cursor = self.conn.execute("SELECT " + ", ".join(
+                    f"(SELECT COALESCE(MAX(rowid), 0) FROM {_quote_identifier(table)})" for table in remaining
+                ))
+                counts.update(zip(remaining, cursor.fetchone()))
+            except sqlite3.OperationalError:
+                # WITHOUT ROWID tables have no rowid to seek
+                counts.update(zip(remaining, self._count_rows(remaining)))
+
+        return {table: counts[table] for table in tables}
+
+    def table_definitions(self) -> Dict[str, str]:
+        """Column summary of each table by name (cached until the table structure changes)"""
+        if self._schema_cache is not None:
+            return self._schema_cache
+        
+        cursor = self.conn.cursor()
+        
+        # Get all tables and their columns in one query
+        cursor.execute("""
+            SELECT m.name, p.name, p.type, p."notnull", p.dflt_value, p.pk
+            FROM sqlite_master m JOIN pragma_table_info(m.name) p
+            WHERE m.type='table' AND m.name NOT LIKE 'sqlite_%'
+            ORDER BY m.rowid, p.cid
+        """)
+        tables: Dict[str, List[str]] = {}
+        for table_name, col_name, col_type, not_null, default_val, pk in cursor.fetchall():
+            constraints = []
+            if pk:
+                constraints.append("PRIMARY KEY")
+            if not_null:
+                constraints.append("NOT NULL")
+            if default_val:
+                constraints.append(f"DEFAULT {default_val}")
+            
+            constraint_str = f" ({', '.join(constraints)})" if constraints else ""
+            tables.setdefault(table_name, []).append(f"  - {col_name}: {col_type}{constraint_str}\n")
+        
+        definitions = {
+            table_name: f"Table: {table_name}\n{''.join(columns)}"
+            for table_name, columns in tables.items()
+        }
+        
+        self._schema_cache = definitions
+        return definitions
+    
+    def get_schema_info(self, with_counts: bool = False) -> str:
+        """
+        Get database schema information
+        Row counts change with every write, so they are only included on request (not in the LLM prompt)
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Get all tables
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-                tables = cursor.fetchall()
-                
-                schema_info = "Database Schema Information:\n\n"
-                
-                for (table_name,) in tables:
-                    schema_info += f"Table: {table_name}\n"
-                    
-                    # Get column information
-                    cursor.execute(f"PRAGMA table_info({table_name})")
-                    columns = cursor.fetchall()
-                    
-                    for col in columns:
-                        col_name, col_type, not_null, default_val, pk = col[1], col[2], col[3], col[4], col[5]
-                        constraints = []
-                        if pk:
-                            constraints.append("PRIMARY KEY")
-                        if not_null:
-                            constraints.append("NOT NULL")
-                        if default_val:
-                            constraints.append(f"DEFAULT {default_val}")
-                        
-                        constraint_str = f" ({', '.join(constraints)})" if constraints else ""
-                        schema_info += f"  - {col_name}: {col_type}{constraint_str}\n"
-                    
-                    # Get row count
-                    cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                    count = cursor.fetchone()[0]
-                    schema_info += f"  Rows: {count}\n\n"
-                
-                return schema_info
-                
+            definitions = self.table_definitions()
+            names = list(definitions)
+            
+            # Get row counts, each table on its own reader when possible
+            counts = self._count_rows(names) if with_counts else [None] * len(names)
+            
+            schema_info = "Database Schema Information:\n\n"
+            for name, count in zip(names, counts):
+                schema_info += definitions[name]
+                if count is not None:
+                    schema_info += f"  Rows: {count}\n"
+                schema_info += "\n"
+            return schema_info
+            
         except Exception as e:
             return f"Error getting schema: {e}"
     
@@ -300,8 +524,12 @@ class DatabaseManager:
             backup_path = f"data/backup_{timestamp}.db"
         
         try:
-            import shutil
-            shutil.copy2(self.db_path, backup_path)
+            # Online page-level copy, consistent even while the database is being written
+            dst = sqlite3.connect(backup_path)
+            try:
+                self.conn.backup(dst, pages=-1)
+            finally:
+                dst.close()
             self.console.print(f"✅ Database backed up to: {backup_path}", style="green")
             return backup_path
         except Exception as e:
@@ -314,7 +542,8 @@ def test_database_manager():
     console = Console()
     console.print(Panel("🧪 Testing Database Manager", style="bold magenta"))
     
-    db = DatabaseManager("data/test_db.db")
+    # Buffer the manager's output and print it in one go at the end
+    db = DatabaseManager("data/test_db.db", quiet=True)
     
     # Test queries
     test_queries = [
@@ -326,14 +555,16 @@ def test_database_manager():
     ]
     
     for query in test_queries:
-        console.print(f"\n🔍 Testing: {query}", style="yellow")
+        db.console.print(f"\n🔍 Testing: {query}", style="yellow")
         result = db.execute_query(query)
         db.display_results(result)
     
     # Display schema
-    console.print("\n📋 Database Schema:", style="blue")
-    schema = db.get_schema_info()
-    console.print(Panel(schema, title="Database Schema", style="cyan"))
+    db.console.print("\n📋 Database Schema:", style="blue")
+    schema = db.get_schema_info(with_counts=True)
+    db.console.print(Panel(schema, title="Database Schema", style="cyan"))
+    
+    console.print(Text.from_ansi(db.console.export_text(styles=True)), end="")
 
 if __name__ == "__main__":
     test_database_manager()
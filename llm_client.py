@@ -5,19 +5,74 @@ Handles communication with local Ollama instance for natural language to SQL con
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import json
-from typing import Optional, List, Dict, Any
+import re
+import hashlib
+import socket
+from urllib.parse import urlsplit
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 import time
 
+from semantic_cache import SemanticCache, DEFAULT_CACHE_PATH
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib encoder
+    orjson = None
+
+def _dumps(payload: Any) -> bytes:
+    """Serialize a request payload to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+def _loads(data: bytes) -> Any:
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# A closed ```sql fence, or a bare statement line, that ends with ';'
+_COMPLETE_SQL_BLOCK_RE = re.compile(r'```sql\s*.*?;\s*```', re.I | re.S)
+_COMPLETE_SQL_LINE_RE = re.compile(r'^[ \t]*(?:SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER)\b[^\n]*;[ \t]*\n', re.I | re.M)
+
+# SQL extraction: a ```sql fence first, otherwise the first line that starts with a statement keyword
+_SQL_BLOCK_RE = re.compile(r'```sql(.*?)```', re.S)
+_SQL_LINE_RE = re.compile(r'^\s*((?:SELECT|INSERT|UPDATE|DELETE|CREATE|DROP|ALTER)[^\n]*)', re.I | re.M)
+
+def _has_complete_sql(text: str) -> bool:
+    """Check whether a partial LLM response already holds a finished SQL statement"""
+    if "```" in text:
+        return _COMPLETE_SQL_BLOCK_RE.search(text) is not None
+    return _COMPLETE_SQL_LINE_RE.search(text) is not None
+
+# Prompts are assembled as: system, schema, history, user. The first two are static
+# and form the prefix Ollama can reuse from its cache; history and the question vary.
+STATIC_PROMPT_MODULES = ("system", "schema")
+
 class LLMClient:
-    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2.5-coder:7b"):
+    def __init__(self, base_url: str = "http://localhost:11434", model: str = "qwen2.5-coder:7b",
+                 cache_path: Optional[str] = DEFAULT_CACHE_PATH):
         self.base_url = base_url
         self.model = model
+        self.keep_alive = "30m"  # How long Ollama keeps the model (and its prompt cache) loaded
         self.console = Console()
-        self.conversation_history = []
+        self.conversation_history = deque(maxlen=6)  # Keep last 6 messages
+        
+        # Translated queries, keyed by prompt prefix hash; exact or near-identical questions hit
+        self._nl_cache = SemanticCache(cache_path)
+        
+        # Keep the connection to Ollama alive between requests
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
         # System prompt that teaches the LLM about SQL generation
         self.system_prompt = """You are DatabaseMate AI, an expert SQL assistant. Your job is to convert natural language into SQLite queries.
@@ -43,18 +98,54 @@ EXAMPLES:
 Human: "Add a user named John with email john@example.com age 25"
 You: INSERT INTO users (name, email, age) VALUES ('John', 'john@example.com', 25);
 """
+        
+        # Static prompt modules (rules, schema); sent once per request ahead of history and the question
+        self._modules: Dict[str, str] = {}
+        self.prefix_hash = ""
+        self.set_module("system", self.system_prompt)
 
     def is_server_available(self) -> bool:
         """Check if Ollama server is running"""
+        # A refused or unanswered TCP connect fails fast, without waiting on the HTTP timeout
+        url = urlsplit(self.base_url)
+        port = url.port or (443 if url.scheme == "https" else 80)
+        try:
+            socket.create_connection((url.hostname, port), timeout=0.2).close()
+        except OSError:
+            return False
+        
+        try:
+            response = self.session.get(f"{self.base_url}/", timeout=5)
+            return response.status_code == 200
+        except requests.exceptions.RequestException:
+            return False
+    
+    def warm_up(self) -> bool:
+        """
+        Load the model and evaluate the system prompt ahead of the first query,
+        so later requests sharing that prefix reuse Ollama's prompt cache
+        """
         try:
-            response = requests.get(f"{self.base_url}/", timeout=5)
+            response = self.session.post(
+                f"{self.base_url}/api/chat",
+                data=_dumps({
+                    "model": self.model,
+                    "messages": [self._system_message()],
+                    "stream": False,
+                    "keep_alive": self.keep_alive,
+                    "options": {"num_predict": 1}
+                }),
+                timeout=120
+            )
             return response.status_code == 200
         except requests.exceptions.RequestException:
             return False
     
-    def query_llm(self, user_message: str, include_context: bool = True) -> Optional[str]:
+    def query_llm(self, user_message: str, include_context: bool = True,
+                  on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
         """
         Send a query to the LLM and get SQL response
+        on_token, if given, is called with the response so far as each chunk streams in
         """
         try:
             # Build the conversation context
@@ -62,38 +153,48 @@ You: INSERT INTO users (name, email, age) VALUES ('John', 'john@example.com', 25
             
             # Add system prompt
             if include_context:
-                messages.append({"role": "system", "content": self.system_prompt})
+                messages.append(self._system_message())
                 
                 # Add conversation history
-                for msg in self.conversation_history[-6:]:  # Keep last 6 messages
-                    messages.append(msg)
+                messages.extend(self.conversation_history)
             
             # Add current user message
             messages.append({"role": "user", "content": user_message})
             
-            # Make API call
-            response = requests.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": self.model,
-                    "messages": messages,
-                    "stream": False
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result["message"]["content"]
+            # Make API call, streaming tokens as they are generated
+            body = _dumps({
+                "model": self.model,
+                "messages": messages,
+                "stream": True,
+                "keep_alive": self.keep_alive
+            })
+            with self.session.post(f"{self.base_url}/api/chat", data=body, stream=True, timeout=30) as response:
+                if response.status_code != 200:
+                    self.console.print(f"❌ API Error: {response.status_code}", style="red")
+                    return None
                 
-                # Store in conversation history
-                self.conversation_history.append({"role": "user", "content": user_message})
-                self.conversation_history.append({"role": "assistant", "content": ai_response})
-                
-                return ai_response
-            else:
-                self.console.print(f"❌ API Error: {response.status_code}", style="red")
-                return None
+                parts = []
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = _loads(line)
+                    content = chunk.get("message", {}).get("content", "")
+                    parts.append(content)
+                    if on_token is not None and content:
+                        on_token("".join(parts))
+                    if chunk.get("done"):
+                        break
+                    # Stop generating as soon as a complete SQL statement has arrived
+                    if (";" in content or "`" in content or "\n" in content) and _has_complete_sql("".join(parts)):
+                        break
+            
+            ai_response = "".join(parts)
+            
+            # Store in conversation history
+            self.conversation_history.append({"role": "user", "content": user_message})
+            self.conversation_history.append({"role": "assistant", "content": ai_response})
+            
+            return ai_response
                 
         except requests.exceptions.Timeout:
             self.console.print("⏰ Request timed out", style="yellow")
@@ -107,44 +208,38 @@ You: INSERT INTO users (name, email, age) VALUES ('John', 'john@example.com', 25
         Extract SQL query from AI response
         """
         # Look for SQL code blocks
-        if "```sql" in ai_response:
-            start = ai_response.find("```sql") + 6
-            end = ai_response.find("```", start)
-            if end != -1:
-                return ai_response[start:end].strip()
+        match = _SQL_BLOCK_RE.search(ai_response)
+        if match:
+            return match.group(1).strip()
         
         # Look for SQL statements (simple heuristic)
-        lines = ai_response.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.upper().startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'CREATE', 'DROP', 'ALTER')):
-                return line
+        match = _SQL_LINE_RE.search(ai_response)
+        if match:
+            return match.group(1).strip()
         
         return ai_response.strip()
     
-    def natural_language_to_sql(self, user_input: str) -> Dict[str, Any]:
+    def natural_language_to_sql(self, user_input: str,
+                                on_token: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
         """
         Convert natural language to SQL query
         Returns dict with SQL, explanation, and metadata
+        on_token receives the partial AI response while it is being generated
         """
         self.console.print(f"🧠 Processing: '{user_input}'", style="blue")
         
-        # Enhanced prompt that asks for both SQL and values
-        enhanced_prompt = f"""
-        {user_input}
-        
-        Please provide:
-        1. The SQL query with actual values (no placeholders like ?)
-        2. Use single quotes for text values
-        3. Extract all values from the natural language input
-        
-        For example:
-        - "add user named John with email john@test.com age 25" → INSERT INTO users (name, email, age) VALUES ('John', 'john@test.com', 25);
-        - "show users older than 30" → SELECT * FROM users WHERE age > 30;
-        """
+        # Reuse the translation of an equivalent question asked at the same point of the conversation
+        cache_prefix = self._cache_prefix()
+        enhanced_prompt = self._enhanced_prompt(user_input)
+        cached = self._nl_cache.get(cache_prefix, user_input)
+        if cached is not None:
+            # The LLM would have seen this turn, so later questions can still refer back to it
+            self.conversation_history.append({"role": "user", "content": enhanced_prompt})
+            self.conversation_history.append({"role": "assistant", "content": cached["explanation"]})
+            return {**cached, "original_query": user_input, "cached": True}
         
         # Query the LLM
-        ai_response = self.query_llm(enhanced_prompt)
+        ai_response = self.query_llm(enhanced_prompt, on_token=on_token)
         
         if not ai_response:
             return {
@@ -159,20 +254,71 @@ You: INSERT INTO users (name, email, age) VALUES ('John', 'john@example.com', 25
             "success": True,
             "sql": sql_query,
             "explanation": ai_response,
-            "original_query": user_input
+            "original_query": user_input,
+            "cache_prefix": cache_prefix
         }
     
-    def add_table_context(self, table_info: str):
-        """Add database table structure to conversation context"""
-        context_msg = f"Database schema information:\n{table_info}"
-        self.conversation_history.append({
-            "role": "system", 
-            "content": context_msg
+    def _enhanced_prompt(self, user_input: str) -> str:
+        """The user turn sent for a question: the question plus instructions for the SQL answer"""
+        return f"""
+        {user_input}
+        
+        Please provide:
+        1. The SQL query with actual values (no placeholders like ?)
+        2. Use single quotes for text values
+        3. Extract all values from the natural language input
+        
+        For example:
+        - "add user named John with email john@test.com age 25" → INSERT INTO users (name, email, age) VALUES ('John', 'john@test.com', 25);
+        - "show users older than 30" → SELECT * FROM users WHERE age > 30;
+        """
+    
+    def _cache_prefix(self) -> str:
+        """Cache key prefix: the static prompt, plus the conversation so far once there is one"""
+        if not self.conversation_history:
+            return self.prefix_hash
+        history = json.dumps(list(self.conversation_history), sort_keys=True)
+        return hashlib.md5((self.prefix_hash + history).encode()).hexdigest()
+    
+    def cache_translation(self, result: Dict[str, Any]):
+        """Remember a translation whose SQL executed successfully"""
+        if not result["success"] or result.get("cached"):
+            return
+        self._nl_cache.put(result["cache_prefix"], result["original_query"], {
+            "success": True,
+            "sql": result["sql"],
+            "explanation": result["explanation"]
         })
     
+    def save_cache(self):
+        """Persist translations cached since the last save"""
+        self._nl_cache.save()
+    
+    def clear_cache(self):
+        """Forget every cached translation (the file is emptied on the next save)"""
+        self._nl_cache.clear()
+        self.console.print("🧹 Translation cache cleared", style="green")
+    
+    def set_module(self, name: str, text: str):
+        """Set a static prompt module: 'system' (rules) or 'schema' (database structure)"""
+        if name not in STATIC_PROMPT_MODULES:
+            raise ValueError(f"Unknown prompt module: {name}")
+        if name == "schema":
+            text = f"Database schema information:\n{text}"
+        
+        # A different prefix invalidates previously cached translations
+        if self._modules.get(name) != text:
+            self._modules[name] = text
+            self.prefix_hash = hashlib.md5(self._system_message()["content"].encode()).hexdigest()
+    
+    def _system_message(self) -> Dict[str, str]:
+        """Static modules joined in a fixed order, so the prefix is byte-identical across turns"""
+        content = "\n\n".join(self._modules[name] for name in STATIC_PROMPT_MODULES if name in self._modules)
+        return {"role": "system", "content": content}
+    
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
+        self.conversation_history.clear()
         self.console.print("🧹 Conversation history cleared", style="green")
     
     def display_response(self, result: Dict[str, Any]):
@@ -218,6 +364,8 @@ def test_llm_client():
         result = client.natural_language_to_sql(query)
         client.display_response(result)
         time.sleep(1)  # Pause between queries
+    
+    client.save_cache()
 
 if __name__ == "__main__":
     test_llm_client()
@@ -5,28 +5,30 @@ Main program that combines LLM and Database components
 """
 import sys
 import os
+import asyncio
+import signal
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
 from rich.console import Console
 from rich.panel import Panel
-from rich.text import Text
 from rich.prompt import Prompt
-from rich.layout import Layout
 from rich.live import Live
+from rich.syntax import Syntax
+from prompt_toolkit import PromptSession
 import time
 
 # Import our custom modules
 from llm_client import LLMClient
 from database_manager import DatabaseManager
 
-class DatabaseMateAI:
-    def __init__(self, db_path: str = "data/database.db"):
-        self.console = Console()
-        self.db_manager = DatabaseManager(db_path)
-        self.llm_client = LLMClient()
-        self.session_queries = []
-        
-    def display_welcome(self):
-        """Display welcome message"""
-        welcome_text = """
+# Words recognised as commands without a leading '/'
+COMMANDS = frozenset({
+    'help', 'h', 'quit', 'q', 'exit', 'schema', 's', 'history', 'hist',
+    'clear', 'cls', 'clear cache', 'backup', 'b', 'stats', 'statistics'
+})
+
+WELCOME_TEXT = """
 🤖 Welcome to DatabaseMate AI!
 
 I'm your natural language database assistant. You can:
@@ -42,17 +44,9 @@ Examples:
 • "What's the total revenue from electronics?"
 
 Type 'help' for commands, 'quit' to exit.
-        """
-        
-        self.console.print(Panel(
-            welcome_text,
-            title="🚀 DatabaseMate AI v1.0",
-            style="bold blue"
-        ))
-    
-    def display_help(self):
-        """Display help information"""
-        help_text = """
+"""
+
+HELP_TEXT = """
 📋 Available Commands:
 
 🔍 Natural Language Queries:
@@ -63,6 +57,7 @@ Type 'help' for commands, 'quit' to exit.
   • schema       - Display database structure
   • history      - Show recent queries
   • clear        - Clear conversation history
+  • clear cache  - Forget cached translations
   • backup       - Create database backup
   • stats        - Show database statistics
   • quit/exit    - Exit the program
@@ -78,32 +73,95 @@ Type 'help' for commands, 'quit' to exit.
   • Dangerous operations require confirmation
   • Automatic backups before major changes
   • Query validation and error handling
-        """
+"""
+
+@contextmanager
+def _interruptible():
+    """
+    Let Ctrl-C raise KeyboardInterrupt in blocking work on the event loop thread.
+    asyncio.run's own SIGINT handler only cancels the main task once that work returns
+    """
+    handler = signal.signal(signal.SIGINT, signal.default_int_handler)
+    try:
+        yield
+    finally:
+        signal.signal(signal.SIGINT, handler)
+
+@lru_cache(maxsize=1)
+def _database_size(db_path: str, time_bucket: int) -> int:
+    """Size of the database plus its WAL file in bytes; time_bucket keeps the result for a few seconds"""
+    size = os.stat(db_path).st_size
+    try:
+        size += os.stat(db_path + "-wal").st_size
+    except FileNotFoundError:
+        pass
+    return size
+
+class DatabaseMateAI:
+    def __init__(self, db_path: str = "data/database.db"):
+        self.console = Console()
+        self.db_manager = DatabaseManager(db_path)
+        self.llm_client = LLMClient()
+        self.session_queries = []
+        self._background_tasks = set()
         
-        self.console.print(Panel(help_text, title="📚 Help Guide", style="green"))
+        # Static panels are built once and reprinted as needed
+        self._welcome_panel = Panel(WELCOME_TEXT, title="🚀 DatabaseMate AI v1.0", style="bold blue")
+        self._help_panel = Panel(HELP_TEXT, title="📚 Help Guide", style="green")
+        self._sql_theme = "ansi_dark"
+        
+        # Command name -> handler; a handler returning False ends the session
+        self._dispatch = {
+            'help': self.display_help, 'h': self.display_help,
+            'schema': self.display_schema, 's': self.display_schema,
+            'history': self.display_history, 'hist': self.display_history,
+            'clear': self._clear_session, 'cls': self._clear_session,
+            'clear cache': self.llm_client.clear_cache,
+            'backup': self._backup, 'b': self._backup,
+            'stats': self.display_stats, 'statistics': self.display_stats,
+            'quit': self._quit, 'exit': self._quit, 'q': self._quit,
+        }
+        
+        # The schema goes to the LLM once and is only re-sent when it changes
+        self.refresh_schema_context()
+    
+    def _schema(self) -> str:
+        """Database schema summary for the LLM, memoized by the DatabaseManager until the table structure changes"""
+        return self.db_manager.get_schema_info()
+    
+    def refresh_schema_context(self):
+        """Update the LLM's schema prompt module (a no-op when the schema is unchanged)"""
+        self.llm_client.set_module("schema", self._schema())
+    
+    def display_welcome(self):
+        """Display welcome message"""
+        self.console.print(self._welcome_panel)
+    
+    def display_help(self):
+        """Display help information"""
+        self.console.print(self._help_panel)
     
     def display_stats(self):
         """Display database statistics"""
         try:
             stats = []
             
-            # Get table counts
             tables = ['users', 'products', 'orders']
-            for table in tables:
-                result = self.db_manager.execute_query(f"SELECT COUNT(*) as count FROM {table}")
-                if result["success"]:
-                    count = result["data"][0]["count"]
-                    stats.append(f"📊 {table.capitalize()}: {count} records")
             
-            # Get recent activity
-            recent_orders = self.db_manager.execute_query("SELECT COUNT(*) as count FROM orders WHERE date(order_date) = date('now')")
-            if recent_orders["success"]:
-                today_orders = recent_orders["data"][0]["count"]
-                stats.append(f"📅 Orders today: {today_orders}")
+            # Estimated table sizes
+            for table, count in self.db_manager.row_counts(tables).items():
+                stats.append(f"📊 {table.capitalize()}: ~{count} records")
+
+            # Recent activity
+            result = self.db_manager.execute_query(
+                "SELECT COUNT(*) AS today FROM orders WHERE date(order_date) = date('now')"
+            )
+            if result["success"]:
+                stats.append(f"📅 Orders today: {result['data'][0]['today']}")
             
             # Database size
-            db_size = os.path.getsize(self.db_manager.db_path) / 1024  # KB
-            stats.append(f"💾 Database size: {db_size:.1f} KB")
+            db_size = _database_size(self.db_manager.db_path, int(time.time() // 5)) >> 10  # KB
+            stats.append(f"💾 Database size: {db_size} KB")
             
             stats_text = "\n".join(stats)
             self.console.print(Panel(stats_text, title="📈 Database Statistics", style="cyan"))
@@ -125,13 +183,13 @@ Type 'help' for commands, 'quit' to exit.
     
     def process_natural_language_query(self, user_input: str):
         """Process a natural language query"""
-        # Add schema context to help the LLM
-        schema_info = self.db_manager.get_schema_info()
-        self.llm_client.add_table_context(schema_info)
-        
-        # Get SQL from LLM
+        # Get SQL from LLM, showing the response live as it streams in
         self.console.print("🧠 Converting to SQL...", style="blue")
-        llm_result = self.llm_client.natural_language_to_sql(user_input)
+        with Live(console=self.console, transient=True, refresh_per_second=10) as live:
+            llm_result = self.llm_client.natural_language_to_sql(
+                user_input,
+                on_token=lambda text: live.update(Panel(text, title="💭 AI is typing...", style="blue"))
+            )
         
         if not llm_result["success"]:
             self.console.print(f"❌ AI Error: {llm_result['error']}", style="red")
@@ -139,9 +197,9 @@ Type 'help' for commands, 'quit' to exit.
         
         sql_query = llm_result["sql"]
         
-        # Display the generated SQL
+        # Display the generated SQL, highlighted
         self.console.print(Panel(
-            sql_query,
+            Syntax(sql_query, "sql", theme=self._sql_theme, word_wrap=True),
             title="🔍 Generated SQL",
             style="yellow"
         ))
@@ -155,13 +213,21 @@ Type 'help' for commands, 'quit' to exit.
                 self.console.print("🚫 Query cancelled", style="yellow")
                 return
         
-        # Execute the query
+        # Execute the query (already checked and confirmed above)
         self.console.print("⚡ Executing query...", style="green")
-        db_result = self.db_manager.execute_query(sql_query)
+        db_result = self.db_manager.execute_query(sql_query, confirmed=True)
         
         # Display results
         self.db_manager.display_results(db_result)
         
+        # Only translations that actually ran are reused for later questions
+        if db_result["success"]:
+            self.llm_client.cache_translation(llm_result)
+        
+        # Table structure changed, so the LLM needs the new schema
+        if db_result["success"] and db_result.get("query_type") in ['CREATE', 'DROP', 'ALTER']:
+            self.refresh_schema_context()
+        
         # Add to session history
         self.session_queries.append(user_input)
         
@@ -173,35 +239,49 @@ Type 'help' for commands, 'quit' to exit.
                 style="blue"
             ))
     
+    def display_schema(self):
+        """Display the database schema (and make sure the LLM has the current one)"""
+        self.refresh_schema_context()
+        schema = self.db_manager.get_schema_info(with_counts=True)
+        self.console.print(Panel(schema, title="🗃️ Database Schema", style="cyan"))
+    
+    def _clear_session(self):
+        """Forget the conversation and the session's query history"""
+        self.llm_client.clear_history()
+        self.session_queries = []
+        self.console.print("🧹 Session cleared", style="green")
+    
+    def _backup(self):
+        """Create a database backup"""
+        backup_path = self.db_manager.backup_database()
+        if backup_path:
+            self.console.print(f"💾 Backup created: {backup_path}", style="green")
+    
+    def _quit(self) -> bool:
+        return False
+    
     def handle_command(self, command: str):
         """Handle special commands"""
         command = command.lower().strip()
         
-        if command in ['help', 'h']:
-            self.display_help()
-        elif command in ['schema', 's']:
-            schema = self.db_manager.get_schema_info()
-            self.console.print(Panel(schema, title="🗃️ Database Schema", style="cyan"))
-        elif command in ['history', 'hist']:
-            self.display_history()
-        elif command in ['clear', 'cls']:
-            self.llm_client.clear_history()
-            self.session_queries = []
-            self.console.print("🧹 Session cleared", style="green")
-        elif command in ['backup', 'b']:
-            backup_path = self.db_manager.backup_database()
-            if backup_path:
-                self.console.print(f"💾 Backup created: {backup_path}", style="green")
-        elif command in ['stats', 'statistics']:
-            self.display_stats()
-        elif command in ['quit', 'exit', 'q']:
-            return False
-        else:
+        handler = self._dispatch.get(command)
+        if handler is None:
             self.console.print(f"❓ Unknown command: {command}. Type 'help' for available commands.", style="yellow")
+            return True
         
-        return True
+        return handler() is not False
     
-    def run(self):
+    def _in_background(self, coro):
+        """Schedule work to run on the event loop while the prompt waits for input"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+    
+    async def _save_sem_cache(self):
+        """Write newly cached translations to disk on a worker thread, keeping the prompt responsive"""
+        await asyncio.to_thread(self.llm_client.save_cache)
+    
+    async def run(self):
         """Main application loop"""
         # Check if Ollama is available
         if not self.llm_client.is_server_available():
@@ -209,31 +289,41 @@ Type 'help' for commands, 'quit' to exit.
             self.console.print("Run: ollama serve", style="yellow")
             return
         
+        # Load the model and its system prompt while the welcome screen is read
+        threading.Thread(target=self.llm_client.warm_up, daemon=True).start()
+        
         # Display welcome message
         self.display_welcome()
         
         # Main interaction loop
+        session = PromptSession()
         try:
             while True:
-                # Get user input
-                user_input = Prompt.ask("\n🤖 DatabaseMate", default="").strip()
+                # Get user input; queued background work runs while we wait
+                user_input = (await session.prompt_async("\n🤖 DatabaseMate › ")).strip()
                 
                 if not user_input:
                     continue
                 
                 # Check if it's a command
-                if user_input.startswith('/') or user_input.lower() in ['help', 'quit', 'exit', 'schema', 'history', 'clear', 'backup', 'stats']:
+                if user_input.startswith('/') or user_input.lower() in COMMANDS:
                     command = user_input.lstrip('/')
-                    if not self.handle_command(command):
+                    with _interruptible():
+                        keep_running = self.handle_command(command)
+                    if not keep_running:
                         break
                 else:
                     # Process as natural language query
-                    self.process_natural_language_query(user_input)
+                    with _interruptible():
+                        self.process_natural_language_query(user_input)
+                    self._in_background(self._save_sem_cache())
                     
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             self.console.print("\n👋 Goodbye!", style="green")
         except Exception as e:
             self.console.print(f"❌ Unexpected error: {e}", style="red")
+        finally:
+            self.llm_client.save_cache()
 
 # Configuration loading
 def load_config():
@@ -253,8 +343,10 @@ def main():
         
         # Create and run the application
         app = DatabaseMateAI(config["db_path"])
-        app.run()
+        asyncio.run(app.run())
         
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        Console().print("\n👋 Goodbye!", style="green")
     except Exception as e:
         console = Console()
         console.print(f"❌ Failed to start DatabaseMate AI: {e}", style="red")
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Semantic Cache for DatabaseMate AI
+Remembers natural language to SQL translations so repeated or reworded questions skip the LLM
+"""
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, similarity search falls back to pure Python
+    np = None
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".databasemate", "sem_cache.json")
+
+_TOKEN_RE = re.compile(r"[a-z0-9_@.']+")
+# Words that can differ between two phrasings of the same question. Request verbs are
+# included because they all ask for a SELECT; comparison and negation words never are
+_STOPWORDS = frozenset({
+    'a', 'an', 'the', 'me', 'us', 'please', 'can', 'you', 'i', 'want', 'to', 'of', 'in',
+    'show', 'list', 'display', 'get', 'give', 'find', 'all', 'every', 'each', 'which',
+    'what', 'whose', 'that', 'are', 'is', 'there'
+})
+# Values that change the meaning of a query: numbers, quoted strings, emails
+_LITERAL_RE = re.compile(r"\d+(?:\.\d+)?|'[^']*'|\"[^\"]*\"|\S+@\S+")
+
+def normalize(question: str) -> str:
+    """Normalize a natural language query so trivial rephrasings share a cache key"""
+    return re.sub(r'\s+', ' ', question.strip().lower().rstrip('?.!'))
+
+def _literals(question: str) -> List[str]:
+    """Values and names in the question that a cached translation must match exactly"""
+    literals = _LITERAL_RE.findall(question.lower())
+    # Capitalized words after the first are usually names ("named John")
+    literals += [word.lower() for word in question.split()[1:] if word[:1].isupper()]
+    return sorted(literals)
+
+def _content_tokens(question: str) -> frozenset:
+    """Words of the question that carry meaning; a fuzzy match must have exactly the same set"""
+    return frozenset(_TOKEN_RE.findall(normalize(question))) - _STOPWORDS
+
+def embed(question: str) -> Dict[int, float]:
+    """Hashed bag of unigrams and bigrams, L2-normalized (a dependency-free text embedding)"""
+    tokens = _TOKEN_RE.findall(normalize(question))
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    counts: Dict[int, int] = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode("utf-8"))
+        counts[index] = counts.get(index, 0) + 1
+
+    vector = {index: 1 + math.log(count) for index, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+    return {index: weight / norm for index, weight in vector.items()}
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    """Cosine similarity of two normalized sparse vectors"""
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+# Width of the dense rows used to prefilter candidates when numpy is available
+_DENSE_DIM = 1024
+
+def _densify(vector: Dict[int, float]) -> "np.ndarray":
+    """
+    Fold a sparse vector into _DENSE_DIM buckets. All weights are positive, so bucket
+    collisions can only raise a dot product: dense scores bound the exact cosine from above
+    """
+    dense = np.zeros(_DENSE_DIM, dtype=np.float32)
+    for index, weight in vector.items():
+        dense[index % _DENSE_DIM] += weight
+    return dense
+
+class SemanticCache:
+    """
+    Two-tier cache of translation results:
+    exact match on (prompt prefix, normalized question), then nearest stored question by cosine similarity
+    among those with the same content words and literals
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_CACHE_PATH, threshold: float = 0.95, max_entries: int = 500):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._dirty = False
+        # save() may run on a worker thread while the REPL keeps using the cache
+        self._lock = threading.Lock()
+
+        # With numpy, every entry also owns a row of one contiguous float32 matrix
+        self._matrix = None
+        if np is not None:
+            self._matrix = np.zeros((max_entries, _DENSE_DIM), dtype=np.float32)
+            self._row_keys: List[Optional[Tuple[str, str]]] = [None] * max_entries
+            self._free_rows = list(range(max_entries - 1, -1, -1))
+
+        self.load()
+
+    def get(self, prefix: str, question: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for this question, or None"""
+        key = (prefix, normalize(question))
+        vector = embed(question)
+        literals = _literals(question)
+        content = _content_tokens(question)
+
+        with self._lock:
+            # Exact tier
+            entry = self._entries.get(key)
+
+            # Semantic tier: most similar question asked against the same prompt prefix, using
+            # the same content words and literals (only word order, repeats and filler may differ)
+            if entry is None:
+                best_score = self.threshold
+                for (entry_prefix, _), candidate in self._candidates(vector):
+                    if entry_prefix != prefix or candidate["literals"] != literals or candidate["content"] != content:
+                        continue
+                    score = cosine(vector, candidate["vector"])
+                    if score >= best_score:
+                        best_score, entry = score, candidate
+
+            if entry is None:
+                return None
+            self._entries.move_to_end((prefix, entry["question"]))
+            return entry["result"]
+
+    def _candidates(self, vector: Dict[int, float]):
+        """Entries that may reach the similarity threshold; all of them without numpy"""
+        if self._matrix is None:
+            return list(self._entries.items())
+        scores = self._matrix @ _densify(vector)  # one BLAS matrix-vector product over every entry
+        rows = np.flatnonzero(scores >= self.threshold - 1e-4)  # slack for float32 rounding
+        keys = [self._row_keys[row] for row in rows]
+        return [(key, self._entries[key]) for key in keys if key is not None]
+
+    def put(self, prefix: str, question: str, result: Dict[str, Any]):
+        """Store a translation result (written to disk on the next save)"""
+        entry = {
+            "question": normalize(question),
+            "literals": _literals(question),
+            "vector": embed(question),
+            "result": result
+        }
+        with self._lock:
+            self._add((prefix, entry["question"]), entry)
+            self._dirty = True
+
+    def _add(self, key: Tuple[str, str], entry: Dict[str, Any]):
+        """Insert or replace an entry as most recently used, evicting the oldest beyond max_entries"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._release_row(old)
+        elif len(self._entries) >= self.max_entries:
+            self._release_row(self._entries.popitem(last=False)[1])
+        self._entries[key] = entry
+        entry["content"] = _content_tokens(entry["question"])
+
+        if self._matrix is not None:
+            row = self._free_rows.pop()
+            self._matrix[row] = _densify(entry["vector"])
+            self._row_keys[row] = key
+            entry["row"] = row
+
+    def _release_row(self, entry: Dict[str, Any]):
+        """Return a removed entry's matrix row to the free list"""
+        if self._matrix is None:
+            return
+        row = entry["row"]
+        self._matrix[row] = 0.0
+        self._row_keys[row] = None
+        self._free_rows.append(row)
+
+    def clear(self):
+        """Remove every entry"""
+        with self._lock:
+            for entry in self._entries.values():
+                self._release_row(entry)
+            self._entries.clear()
+            self._dirty = True
+
+    def load(self):
+        """Load persisted entries, ignoring a missing or unreadable cache file"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                stored = json.load(f)
+            for item in stored:
+                item["vector"] = {int(index): weight for index, weight in item["vector"].items()}
+                self._add((item.pop("prefix"), item["question"]), item)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            for entry in self._entries.values():
+                self._release_row(entry)
+            self._entries.clear()
+
+    def save(self):
+        """Write the cache to disk if it changed (best effort)"""
+        if not self.path:
+            return
+        # Snapshot under the lock, then write without holding it
+        with self._lock:
+            if not self._dirty:
+                return
+            stored = [
+                {"prefix": prefix, **{name: value for name, value in entry.items() if name not in ("row", "content")}}
+                for (prefix, _), entry in self._entries.items()
+            ]
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+# Test function
+def test_semantic_cache():
+    """Test exact and fuzzy lookups, and that a single changed word is never a fuzzy hit"""
+    cache = SemanticCache(path=None)
+    pending = ("list every order whose status is pending together with the customer name, the customer email, "
+               "the product name, the product price and the quantity, sorted by order date with the newest orders first please")
+    shipped = pending.replace("pending", "shipped")
+    cache.put("prefix", pending, {"sql": "pending"})
+
+    assert cache.get("prefix", pending.upper() + "?") == {"sql": "pending"}
+    assert cache.get("prefix", pending[:-len(" please")]) == {"sql": "pending"}
+    assert cache.get("other prefix", pending) is None
+    assert cosine(embed(pending), embed(shipped)) >= cache.threshold
+    assert cache.get("prefix", shipped) is None
+
+    more = ("list every product whose total revenue from all orders placed so far this year by returning customers "
+            "in any region is more than the average revenue of the other products in its category")
+    cache.put("prefix", more, {"sql": "more"})
+    assert cosine(embed(more), embed(more.replace("more", "less"))) >= cache.threshold
+    assert cache.get("prefix", more.replace("more", "less")) is None
+    assert cache.get("prefix", more.replace("average", "average 25")) is None
+
+    cache.clear()
+    assert len(cache) == 0 and cache.get("prefix", pending) is None
+    print("✅ Semantic cache tests passed")
+
+if __name__ == "__main__":
+    test_semantic_cache()
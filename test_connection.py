@@ -2,15 +2,31 @@
 """
 Test connection to Ollama server
 """
-import requests
 import json
-from rich.console import Console
-from rich.panel import Panel
-from rich.text import Text
+from functools import lru_cache
 
-console = Console()
+# requests and rich are imported where they are used, so importing this module stays cheap
+
+@lru_cache(maxsize=None)
+def _console():
+    from rich.console import Console
+    return Console()
+
+@lru_cache(maxsize=None)
+def _session():
+    """One keep-alive session shared by every request to the Ollama server"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=4))
+    return session
 
 def test_ollama():
+    import requests
+    from rich.panel import Panel
+    from rich.live import Live
+    
+    console = _console()
     console.print(Panel("🧪 Testing Ollama Connection", style="blue"))
     
     try:
@@ -18,7 +34,7 @@ def test_ollama():
         console.print("📡 Checking if Ollama server is running...")
         
         # First, let's check if the server is accessible
-        response = requests.get('http://localhost:11434/', timeout=5)
+        response = _session().get('http://localhost:11434/', timeout=5)
         
         if response.status_code == 200:
             console.print("✅ Ollama server is running!", style="green")
@@ -28,18 +44,29 @@ def test_ollama():
         # Test if our model is available
         console.print("🤖 Testing model availability...")
         
-        response = requests.post('http://localhost:11434/api/generate', 
-                               json={
-                                   'model': 'qwen2.5-coder:7b',
-                                   'prompt': 'Convert this to SQL: show all users',
-                                   'stream': False
-                               },
-                               timeout=30)
+        response = _session().post('http://localhost:11434/api/generate', 
+                                  json={
+                                      'model': 'qwen2.5-coder:7b',
+                                      'prompt': 'Convert this to SQL: show all users',
+                                      'stream': True
+                                  },
+                                  stream=True,
+                                  timeout=30)
         
         if response.status_code == 200:
-            result = response.json()
             console.print("✅ Model is working!", style="green")
-            console.print(Panel(f"AI Response: {result['response']}", title="🤖 AI Output", style="green"))
+            
+            # Show the answer token by token as the model generates it
+            chunks = []
+            with Live(Panel("AI Response: ", title="🤖 AI Output", style="green"), console=console) as live:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    chunks.append(chunk.get('response', ''))
+                    live.update(Panel(f"AI Response: {''.join(chunks)}", title="🤖 AI Output", style="green"))
+                    if chunk.get('done'):
+                        break
             return True
         else:
             console.print(f"❌ Model request failed: {response.status_code}", style="red")
@@ -59,6 +86,7 @@ def test_ollama():
 
 def check_model_status():
     """Check if the model is downloaded"""
+    console = _console()
     console.print("📋 Checking available models...")
     
     try:
@@ -84,6 +112,9 @@ def check_model_status():
         return False
 
 if __name__ == "__main__":
+    from rich.panel import Panel
+    
+    console = _console()
     console.print(Panel("🚀 DatabaseMate AI - Connection Test", style="bold magenta"))
     
     # Check model status first